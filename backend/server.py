@@ -1,32 +1,182 @@
-import google.generativeai as genai
 from fastapi import FastAPI, APIRouter, Request, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+import httpx
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
+import time
 import uuid
-from datetime import datetime, timezone, timedelta
+import hashlib
+from collections import deque
+from datetime import datetime, timezone
 
-import json
-import re
+import orjson
+from cachetools import TTLCache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware so BSON dates read back as UTC datetimes, matching what POST /status returns
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
-# In-memory rate limiting storage
-rate_limits: Dict[str, Dict[str, Any]] = {}
+# Google Gemini REST API, called through one pooled HTTP/2 client so
+# connections and TLS sessions are reused across requests
+gemini_api_key = os.environ.get('GOOGLE_GEMINI_API_KEY')
+GEMINI_MODEL_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro"
+gemini_http = httpx.AsyncClient(
+    http2=True,
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=32),
+    headers={"Content-Type": "application/json"}
+)
+
+
+# Rate limits are enforced over a rolling window split into fixed buckets
+GENERATION_LIMIT = 1
+REVISION_LIMIT = 3
+# Times are whole epoch seconds, which are cheaper to get and compare than datetimes
+RATE_LIMIT_WINDOW = 24 * 60 * 60
+RATE_LIMIT_BUCKET = 60 * 60
+RATE_LIMITS = {"generation": GENERATION_LIMIT, "revision": REVISION_LIMIT}
+
+
+class _Bucket:
+    """Usage counted within one bucket of the rate limit window"""
+    __slots__ = ("start", "generations", "revisions")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.generations = 0
+        self.revisions = 0
+
+
+class _Limits:
+    """Per-IP usage buckets, oldest first"""
+    __slots__ = ("buckets",)
+
+    def __init__(self):
+        self.buckets: deque[_Bucket] = deque()
+
+    def advance(self, now: int) -> None:
+        """Drop buckets that have fallen out of the window"""
+        buckets = self.buckets
+        while buckets and buckets[0].start + RATE_LIMIT_WINDOW <= now:
+            buckets.popleft()
+
+    def current_bucket(self, now: int) -> _Bucket:
+        """Get the bucket covering now, opening a new one if needed"""
+        start = now - now % RATE_LIMIT_BUCKET
+        buckets = self.buckets
+        if not buckets or buckets[-1].start != start:
+            buckets.append(_Bucket(start))
+        return buckets[-1]
+
+    def used(self) -> tuple[int, int]:
+        """Total (generations, revisions) used within the window"""
+        generations = revisions = 0
+        for bucket in self.buckets:
+            generations += bucket.generations
+            revisions += bucket.revisions
+        return generations, revisions
+
+    def reset_time(self, now: int) -> int:
+        """When the oldest usage in the window expires"""
+        if not self.buckets:
+            return now + RATE_LIMIT_WINDOW
+        return self.buckets[0].start + RATE_LIMIT_WINDOW
+
+
+# In-memory rate limiting storage, bounded so unique IPs can't grow it forever.
+# Entries expire one window after their last recorded usage.
+RATE_LIMIT_MAX_CLIENTS = 100_000
+rate_limits: TTLCache = TTLCache(
+    maxsize=RATE_LIMIT_MAX_CLIENTS,
+    ttl=RATE_LIMIT_WINDOW
+)
+
+# Parsed Gemini palettes keyed on a digest of the prompt, so identical
+# requests don't pay for another Gemini call
+PALETTE_CACHE_SIZE = 1024
+PALETTE_CACHE_TTL = 3600
+palette_cache: TTLCache = TTLCache(maxsize=PALETTE_CACHE_SIZE, ttl=PALETTE_CACHE_TTL)
+
+# Shared rate limiting storage for multi-worker deployments. Without REDIS_URL
+# (or while Redis is unreachable) limits fall back to the in-memory cache above.
+redis_url = os.environ.get('REDIS_URL')
+# Short timeouts so an unreachable Redis falls back quickly instead of hanging requests
+REDIS_TIMEOUT = 1
+redis_client = aioredis.from_url(
+    redis_url,
+    socket_connect_timeout=REDIS_TIMEOUT,
+    socket_timeout=REDIS_TIMEOUT
+) if redis_url else None
+
+# Sums a client's live usage buckets, dropping expired ones, and records one
+# more use in the current bucket if the limit allows it. Returns {allowed, remaining}.
+_RATE_LIMIT_CHECK_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local bucket = now - now % tonumber(ARGV[3])
+local limit = tonumber(ARGV[4])
+local used = 0
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+  if tonumber(entries[i]) + window <= now then
+    redis.call('HDEL', KEYS[1], entries[i])
+  else
+    used = used + tonumber(entries[i + 1])
+  end
+end
+if used >= limit then
+  return {0, 0}
+end
+redis.call('HINCRBY', KEYS[1], bucket, 1)
+redis.call('EXPIRE', KEYS[1], window)
+return {1, limit - used - 1}
+"""
+
+# Returns {used, oldest_bucket_start} per key, with -1 when a key has no live usage.
+_RATE_LIMIT_USAGE_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local result = {}
+for k = 1, #KEYS do
+  local used = 0
+  local oldest = -1
+  local entries = redis.call('HGETALL', KEYS[k])
+  for i = 1, #entries, 2 do
+    local start = tonumber(entries[i])
+    if start + window > now then
+      used = used + tonumber(entries[i + 1])
+      if oldest == -1 or start < oldest then
+        oldest = start
+      end
+    end
+  end
+  result[#result + 1] = used
+  result[#result + 1] = oldest
+end
+return result
+"""
+
+if redis_client is not None:
+    rate_limit_check_script = redis_client.register_script(_RATE_LIMIT_CHECK_LUA)
+    rate_limit_usage_script = redis_client.register_script(_RATE_LIMIT_USAGE_LUA)
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -107,122 +257,262 @@ def get_client_ip(request: Request) -> str:
     """Get client IP from request headers or connection"""
     forwarded = request.headers.get("x-forwarded-for")
     if forwarded:
-        return forwarded.split(",")[0].strip()
+        return forwarded.partition(",")[0].strip()
     return request.client.host if request.client else "unknown"
 
 
-def check_rate_limit(ip: str, limit_type: str) -> tuple[bool, int]:
+def _isoformat_epoch(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+def _rate_limit_key(ip: str, limit_type: str) -> str:
+    return f"ratelimit:{limit_type}:{ip}"
+
+
+async def check_rate_limit(ip: str, limit_type: str) -> tuple[bool, int]:
     """Check and update rate limits. Returns (allowed, remaining)"""
-    now = datetime.now(timezone.utc)
+    now = int(time.time())
     
-    if ip not in rate_limits:
-        rate_limits[ip] = {
-            "generations": 1,
-            "revisions": 3,
-            "reset_time": now + timedelta(days=1)
-        }
+    if redis_client is not None:
+        try:
+            return await _check_redis_rate_limit(ip, limit_type, now)
+        except RedisError as e:
+            logger.warning(f"Redis rate limiting unavailable, using in-memory limits: {e}")
+    
+    return _check_local_rate_limit(ip, limit_type, now)
+
+
+async def get_remaining_limits(ip: str) -> dict:
+    """Get remaining limits for an IP"""
+    now = int(time.time())
+    
+    if redis_client is not None:
+        try:
+            return await _get_redis_remaining_limits(ip, now)
+        except RedisError as e:
+            logger.warning(f"Redis rate limiting unavailable, using in-memory limits: {e}")
+    
+    return _get_local_remaining_limits(ip, now)
+
+
+async def _check_redis_rate_limit(ip: str, limit_type: str, now: int) -> tuple[bool, int]:
+    """Atomically check and record usage in Redis"""
+    limit = RATE_LIMITS.get(limit_type)
+    if limit is None:
+        return False, 0
     
-    user_limits = rate_limits[ip]
+    allowed, remaining = await rate_limit_check_script(
+        keys=[_rate_limit_key(ip, limit_type)],
+        args=[
+            now,
+            RATE_LIMIT_WINDOW,
+            RATE_LIMIT_BUCKET,
+            limit
+        ]
+    )
+    return bool(allowed), int(remaining)
+
+
+async def _get_redis_remaining_limits(ip: str, now: int) -> dict:
+    """Read remaining limits from Redis without recording usage"""
+    generations, oldest_generation, revisions, oldest_revision = await rate_limit_usage_script(
+        keys=[_rate_limit_key(ip, "generation"), _rate_limit_key(ip, "revision")],
+        args=[now, RATE_LIMIT_WINDOW]
+    )
+    
+    oldest = [int(start) for start in (oldest_generation, oldest_revision) if int(start) >= 0]
+    reset_time = (min(oldest) if oldest else now) + RATE_LIMIT_WINDOW
+    
+    return {
+        "generations_remaining": max(GENERATION_LIMIT - int(generations), 0),
+        "revisions_remaining": max(REVISION_LIMIT - int(revisions), 0),
+        "reset_time": _isoformat_epoch(reset_time)
+    }
+
+
+def _check_local_rate_limit(ip: str, limit_type: str, now: int) -> tuple[bool, int]:
+    """Check and update rate limits held in this process"""
+    user_limits = rate_limits.get(ip)
+    if user_limits is None:
+        user_limits = _Limits()
     
-    # Reset if past reset time
-    if now >= user_limits["reset_time"]:
-        user_limits["generations"] = 1
-        user_limits["revisions"] = 3
-        user_limits["reset_time"] = now + timedelta(days=1)
+    # Expire usage that has left the rolling window
+    user_limits.advance(now)
+    generations, revisions = user_limits.used()
     
     if limit_type == "generation":
-        if user_limits["generations"] <= 0:
+        if generations >= GENERATION_LIMIT:
             return False, 0
-        user_limits["generations"] -= 1
-        return True, user_limits["generations"]
+        user_limits.current_bucket(now).generations += 1
+        rate_limits[ip] = user_limits
+        return True, GENERATION_LIMIT - generations - 1
     elif limit_type == "revision":
-        if user_limits["revisions"] <= 0:
+        if revisions >= REVISION_LIMIT:
             return False, 0
-        user_limits["revisions"] -= 1
-        return True, user_limits["revisions"]
+        user_limits.current_bucket(now).revisions += 1
+        rate_limits[ip] = user_limits
+        return True, REVISION_LIMIT - revisions - 1
     
     return False, 0
 
 
-def get_remaining_limits(ip: str) -> dict:
-    """Get remaining limits for an IP"""
-    now = datetime.now(timezone.utc)
-    
-    if ip not in rate_limits:
+def _get_local_remaining_limits(ip: str, now: int) -> dict:
+    """Get remaining limits held in this process"""
+    user_limits = rate_limits.get(ip)
+    if user_limits is None:
         return {
-            "generations_remaining": 1,
-            "revisions_remaining": 3,
-            "reset_time": (now + timedelta(days=1)).isoformat()
+            "generations_remaining": GENERATION_LIMIT,
+            "revisions_remaining": REVISION_LIMIT,
+            "reset_time": _isoformat_epoch(now + RATE_LIMIT_WINDOW)
         }
     
-    user_limits = rate_limits[ip]
-    
-    # Reset if past reset time
-    if now >= user_limits["reset_time"]:
-        return {
-            "generations_remaining": 1,
-            "revisions_remaining": 3,
-            "reset_time": (now + timedelta(days=1)).isoformat()
-        }
+    user_limits.advance(now)
+    generations, revisions = user_limits.used()
     
     return {
-        "generations_remaining": user_limits["generations"],
-        "revisions_remaining": user_limits["revisions"],
-        "reset_time": user_limits["reset_time"].isoformat()
+        "generations_remaining": max(GENERATION_LIMIT - generations, 0),
+        "revisions_remaining": max(REVISION_LIMIT - revisions, 0),
+        "reset_time": _isoformat_epoch(user_limits.reset_time(now))
     }
 
 
-def parse_palette_response(response_text: str) -> List[Palette]:
-    """Parse AI response into palette objects"""
-    palettes = []
+def _find_json_span(text: str, open_ch: str, close_ch: str, start: int = 0) -> Optional[tuple[int, int]]:
+    """Find the first balanced open_ch...close_ch span at or after start. Returns (start, end) or None"""
+    begin = text.find(open_ch, start)
+    if begin == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(begin, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return begin, i + 1
+    
+    return None
+
+
+def _gemini_request(method: str, text: str, system_instruction: Optional[str] = None, **params: str) -> httpx.Request:
+    """Build a Gemini REST request for a single user message"""
+    body: Dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": text}]}]}
+    if system_instruction:
+        body["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    return gemini_http.build_request(
+        "POST",
+        f"{GEMINI_MODEL_URL}:{method}",
+        params=params,
+        headers={"x-goog-api-key": gemini_api_key or ""},
+        content=orjson.dumps(body)
+    )
+
+
+def _gemini_text(payload: Dict[str, Any]) -> str:
+    """Join the text parts of the first candidate in a Gemini response"""
+    candidates = payload.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+async def gemini_generate(text: str, system_instruction: Optional[str] = None) -> str:
+    """Generate a complete Gemini reply"""
+    response = await gemini_http.send(_gemini_request("generateContent", text, system_instruction))
+    response.raise_for_status()
+    return _gemini_text(orjson.loads(response.content))
+
+
+async def gemini_stream(text: str, system_instruction: Optional[str] = None) -> httpx.Response:
+    """Start a streamed Gemini reply, raising before any body is read if the request fails"""
+    response = await gemini_http.send(
+        _gemini_request("streamGenerateContent", text, system_instruction, alt="sse"),
+        stream=True
+    )
+    if response.is_error:
+        await response.aread()
+        await response.aclose()
+        response.raise_for_status()
+    return response
+
+
+def _build_palettes(items: Any) -> List[Palette]:
+    """Build validated palettes from parsed AI items, filling in missing fields.
+    Raises ValueError (including Pydantic's ValidationError) on malformed items"""
+    if not isinstance(items, list):
+        raise ValueError(f"expected a list of palettes, got {type(items).__name__}")
     
-    # Try to find JSON in the response
-    json_match = re.search(r'\[[\s\S]*\]', response_text)
-    if json_match:
+    palettes = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f"expected a palette object, got {type(item).__name__}")
+        item_colors = item.get("colors", [])
+        if not isinstance(item_colors, list):
+            raise ValueError(f"expected a list of colors, got {type(item_colors).__name__}")
+        
+        colors = []
+        for color in item_colors:
+            if not isinstance(color, dict):
+                raise ValueError(f"expected a color object, got {type(color).__name__}")
+            colors.append(Color(
+                hex=color.get("hex", "#000000"),
+                name=color.get("name", "Unknown"),
+                usage=color.get("usage", "General")
+            ))
+        palettes.append(Palette(
+            name=item.get("name", "Palette"),
+            description=item.get("description", ""),
+            colors=colors,
+            psychology=item.get("psychology", "")
+        ))
+    return palettes
+
+
+def parse_palette_response(response_text: str) -> List[Palette]:
+    """Parse AI response into palette objects. Returns [] if the palettes are malformed"""
+    # Try to find a JSON array in the response, skipping bracketed prose before it
+    json_span = _find_json_span(response_text, "[", "]")
+    while json_span:
+        try:
+            data = orjson.loads(response_text[json_span[0]:json_span[1]])
+        except orjson.JSONDecodeError:
+            data = None
+        # Prose like "[1]" can decode too; palettes are a non-empty list of objects
+        if not data or not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            json_span = _find_json_span(response_text, "[", "]", json_span[1])
+            continue
         try:
-            data = json.loads(json_match.group())
-            for item in data:
-                colors = []
-                for color in item.get("colors", []):
-                    colors.append(Color(
-                        hex=color.get("hex", "#000000"),
-                        name=color.get("name", "Unknown"),
-                        usage=color.get("usage", "General")
-                    ))
-                palettes.append(Palette(
-                    name=item.get("name", "Palette"),
-                    description=item.get("description", ""),
-                    colors=colors,
-                    psychology=item.get("psychology", "")
-                ))
-            return palettes
-        except json.JSONDecodeError:
-            pass
+            return _build_palettes(data)
+        except ValueError as e:
+            logger.warning(f"Discarding malformed palettes from AI response: {e}")
+            return []
     
-    # Fallback: try to extract JSON object
-    json_obj_match = re.search(r'\{[\s\S]*"palettes"[\s\S]*\}', response_text)
-    if json_obj_match:
+    # Fallback: try to extract JSON object containing "palettes"
+    json_obj_span = _find_json_span(response_text, "{", "}")
+    while json_obj_span and '"palettes"' not in response_text[json_obj_span[0]:json_obj_span[1]]:
+        json_obj_span = _find_json_span(response_text, "{", "}", json_obj_span[1])
+    if json_obj_span:
         try:
-            data = json.loads(json_obj_match.group())
-            for item in data.get("palettes", []):
-                colors = []
-                for color in item.get("colors", []):
-                    colors.append(Color(
-                        hex=color.get("hex", "#000000"),
-                        name=color.get("name", "Unknown"),
-                        usage=color.get("usage", "General")
-                    ))
-                palettes.append(Palette(
-                    name=item.get("name", "Palette"),
-                    description=item.get("description", ""),
-                    colors=colors,
-                    psychology=item.get("psychology", "")
-                ))
-            return palettes
-        except json.JSONDecodeError:
-            pass
+            data = orjson.loads(response_text[json_obj_span[0]:json_obj_span[1]])
+        except orjson.JSONDecodeError:
+            return []
+        try:
+            return _build_palettes(data.get("palettes", []))
+        except ValueError as e:
+            logger.warning(f"Discarding malformed palettes from AI response: {e}")
     
-    return palettes
+    return []
 
 
 # Routes
@@ -236,17 +526,15 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     _ = await db.status_checks.insert_one(doc)
     return status_obj
 
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    status_checks = await db.status_checks.find(
+        {}, {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+    ).sort("timestamp", -1).limit(1000).to_list(1000)
     return status_checks
 
 
@@ -254,36 +542,32 @@ async def get_status_checks():
 async def get_rate_limit_status(request: Request):
     """Get current rate limit status for the client"""
     ip = get_client_ip(request)
-    limits = get_remaining_limits(ip)
+    limits = await get_remaining_limits(ip)
     return RateLimitStatus(**limits)
 
 
-@api_router.post("/generate-palettes", response_model=PaletteGenerationResponse)
-async def generate_palettes(request: Request, data: PaletteGenerationRequest):
-    """Generate color palettes using AI"""
-    ip = get_client_ip(request)
-    
-    # Check rate limit
-    allowed, remaining = check_rate_limit(ip, "generation")
-    if not allowed:
-        raise HTTPException(
-            status_code=429,
-            detail="Daily generation limit reached. Please try again tomorrow."
-        )
-    
-    # Build the prompt
-    age_groups_str = ", ".join(data.age_groups)
-    prompt = f"""Generate 5 professional color palettes for a {data.business_name} business in the {data.business_category} industry.
+def palette_generation_response(palettes: List[Palette], remaining: int) -> ORJSONResponse:
+    """Build the palette response directly, skipping FastAPI's response_model pass.
+    Callers must pass validated palettes: parse_palette_response output, cached
+    copies of it, or the curated fallbacks"""
+    return ORJSONResponse({
+        "palettes": [palette.model_dump() for palette in palettes],
+        "remaining_generations": remaining
+    })
+
+
+# Palette generation prompt, filled in per request with format_map
+PALETTE_PROMPT_TEMPLATE = """Generate 5 professional color palettes for a {business_name} business in the {business_category} industry.
 
 Target Audience:
-- Country: {data.target_country}
+- Country: {target_country}
 - Age Groups: {age_groups_str}
-- Gender: {data.target_gender}
-{f"- Brand Values: {data.brand_values}" if data.brand_values else ""}
-{f"- Competitors to differentiate from: {data.competitors}" if data.competitors else ""}
+- Gender: {target_gender}
+{brand_values_line}
+{competitors_line}
 
 For each palette, provide exactly 5 colors. Consider:
-1. Cultural color associations for {data.target_country}
+1. Cultural color associations for {target_country}
 2. Age-appropriate appeal for {age_groups_str}
 3. Gender preferences if applicable
 4. Industry standards and competitor differentiation
@@ -304,154 +588,182 @@ Return ONLY a JSON array with this exact structure (no other text):
   }}
 ]"""
 
-    # Use Google Gemini API for palette generation
-    gemini_api_key = os.environ.get('GOOGLE_GEMINI_API_KEY')
+
+@api_router.post("/generate-palettes", response_model=PaletteGenerationResponse)
+async def generate_palettes(request: Request, data: PaletteGenerationRequest):
+    """Generate color palettes using AI"""
+    ip = get_client_ip(request)
+    
+    # Reject bad input and server misconfiguration before spending the user's quota
+    if not data.business_name.strip() or not data.business_category.strip() or not data.age_groups:
+        raise HTTPException(
+            status_code=422,
+            detail="Business name, business category and age groups are required."
+        )
+    
     if not gemini_api_key:
         logger.error('GOOGLE_GEMINI_API_KEY not set')
         raise HTTPException(status_code=500, detail='Google Gemini API key not configured')
+    
+    # Check rate limit
+    allowed, remaining = await check_rate_limit(ip, "generation")
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Daily generation limit reached. Please try again tomorrow."
+        )
+    
+    # Build the prompt
+    prompt = PALETTE_PROMPT_TEMPLATE.format_map({
+        "business_name": data.business_name,
+        "business_category": data.business_category,
+        "target_country": data.target_country,
+        "age_groups_str": ", ".join(data.age_groups),
+        "target_gender": data.target_gender,
+        "brand_values_line": f"- Brand Values: {data.brand_values}" if data.brand_values else "",
+        "competitors_line": f"- Competitors to differentiate from: {data.competitors}" if data.competitors else ""
+    })
+
+    # Use Google Gemini API for palette generation
+    cache_key = hashlib.blake2b(prompt.encode(), digest_size=16).digest()
+    cached = palette_cache.get(cache_key)
+    if cached:
+        return palette_generation_response(with_fresh_ids(cached), remaining)
 
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-pro')
     try:
-        response = model.generate_content(prompt)
-        if hasattr(response, 'text'):
-            palettes = parse_palette_response(response.text)
+        palettes = parse_palette_response(await gemini_generate(prompt))
+        if palettes:
+            # parse_palette_response only returns validated palettes, so malformed
+            # AI output is never cached and replayed
+            palette_cache[cache_key] = palettes
         else:
-            palettes = []
-        if not palettes:
             palettes = generate_fallback_palettes(data.business_category)
-        return PaletteGenerationResponse(
-            palettes=palettes,
-            remaining_generations=remaining
-        )
+        return palette_generation_response(palettes, remaining)
     except Exception as e:
         logger.error(f"Error generating palettes with Gemini: {e}")
         palettes = generate_fallback_palettes(data.business_category)
-        return PaletteGenerationResponse(
-            palettes=palettes,
-            remaining_generations=remaining
-        )
+        return palette_generation_response(palettes, remaining)
 
 
-def generate_fallback_palettes(category: str) -> List[Palette]:
-    """Generate fallback palettes based on category"""
-    fallback_palettes = {
-        "Food & Beverage": [
-            Palette(
-                name="Warm Appetite",
-                description="Warm, inviting colors that stimulate appetite",
-                psychology="Red and orange stimulate hunger, while earth tones create comfort",
-                colors=[
-                    Color(hex="#D4380D", name="Tomato Red", usage="Primary"),
-                    Color(hex="#FA8C16", name="Orange Zest", usage="Secondary"),
-                    Color(hex="#FADB14", name="Golden Yellow", usage="Accent"),
-                    Color(hex="#F5F0E6", name="Cream", usage="Background"),
-                    Color(hex="#3D3D3D", name="Espresso", usage="Text")
-                ]
-            )
-        ],
-        "Technology": [
-            Palette(
-                name="Digital Trust",
-                description="Modern, trustworthy tech palette",
-                psychology="Blue conveys trust and reliability, common in tech branding",
-                colors=[
-                    Color(hex="#1890FF", name="Tech Blue", usage="Primary"),
-                    Color(hex="#13C2C2", name="Cyan", usage="Secondary"),
-                    Color(hex="#722ED1", name="Purple", usage="Accent"),
-                    Color(hex="#F0F5FF", name="Ice White", usage="Background"),
-                    Color(hex="#262626", name="Charcoal", usage="Text")
-                ]
-            )
-        ]
-    }
-    
-    default_palettes = [
-        Palette(
-            name="Professional Classic",
-            description="Timeless professional palette",
-            psychology="Blue builds trust, neutral tones provide balance",
-            colors=[
-                Color(hex="#2F54EB", name="Royal Blue", usage="Primary"),
-                Color(hex="#597EF7", name="Light Blue", usage="Secondary"),
-                Color(hex="#F5222D", name="Action Red", usage="Accent"),
-                Color(hex="#FAFAFA", name="Off White", usage="Background"),
-                Color(hex="#1F1F1F", name="Near Black", usage="Text")
-            ]
-        ),
-        Palette(
-            name="Modern Minimal",
-            description="Clean, contemporary design",
-            psychology="Monochrome with accent creates sophisticated modern feel",
-            colors=[
-                Color(hex="#000000", name="Pure Black", usage="Primary"),
-                Color(hex="#595959", name="Gray", usage="Secondary"),
-                Color(hex="#EB2F96", name="Magenta", usage="Accent"),
-                Color(hex="#FFFFFF", name="White", usage="Background"),
-                Color(hex="#262626", name="Dark Gray", usage="Text")
-            ]
-        ),
-        Palette(
-            name="Nature Inspired",
-            description="Organic, earthy tones",
-            psychology="Green represents growth and harmony, connecting to nature",
-            colors=[
-                Color(hex="#52C41A", name="Fresh Green", usage="Primary"),
-                Color(hex="#389E0D", name="Forest", usage="Secondary"),
-                Color(hex="#FAAD14", name="Sunflower", usage="Accent"),
-                Color(hex="#F6FFED", name="Mint Cream", usage="Background"),
-                Color(hex="#135200", name="Deep Green", usage="Text")
-            ]
-        ),
+# Curated palettes used when the AI response can't be used, built once at import
+FALLBACK_PALETTES: Dict[str, List[Palette]] = {
+    "Food & Beverage": [
         Palette(
-            name="Warm Sunset",
-            description="Energetic and inviting",
-            psychology="Warm colors evoke energy, passion, and friendliness",
+            name="Warm Appetite",
+            description="Warm, inviting colors that stimulate appetite",
+            psychology="Red and orange stimulate hunger, while earth tones create comfort",
             colors=[
-                Color(hex="#FA541C", name="Sunset Orange", usage="Primary"),
-                Color(hex="#FAAD14", name="Gold", usage="Secondary"),
-                Color(hex="#F5222D", name="Coral Red", usage="Accent"),
-                Color(hex="#FFF7E6", name="Warm White", usage="Background"),
-                Color(hex="#AD2102", name="Deep Orange", usage="Text")
+                Color(hex="#D4380D", name="Tomato Red", usage="Primary"),
+                Color(hex="#FA8C16", name="Orange Zest", usage="Secondary"),
+                Color(hex="#FADB14", name="Golden Yellow", usage="Accent"),
+                Color(hex="#F5F0E6", name="Cream", usage="Background"),
+                Color(hex="#3D3D3D", name="Espresso", usage="Text")
             ]
-        ),
+        )
+    ],
+    "Technology": [
         Palette(
-            name="Cool Ocean",
-            description="Calm and refreshing",
-            psychology="Cool tones promote relaxation and trust",
+            name="Digital Trust",
+            description="Modern, trustworthy tech palette",
+            psychology="Blue conveys trust and reliability, common in tech branding",
             colors=[
-                Color(hex="#1890FF", name="Ocean Blue", usage="Primary"),
-                Color(hex="#13C2C2", name="Teal", usage="Secondary"),
-                Color(hex="#722ED1", name="Purple Accent", usage="Accent"),
-                Color(hex="#E6F7FF", name="Sky White", usage="Background"),
-                Color(hex="#003A8C", name="Deep Blue", usage="Text")
+                Color(hex="#1890FF", name="Tech Blue", usage="Primary"),
+                Color(hex="#13C2C2", name="Cyan", usage="Secondary"),
+                Color(hex="#722ED1", name="Purple", usage="Accent"),
+                Color(hex="#F0F5FF", name="Ice White", usage="Background"),
+                Color(hex="#262626", name="Charcoal", usage="Text")
             ]
         )
     ]
-    
-    return fallback_palettes.get(category, default_palettes)
+}
+
+DEFAULT_PALETTES: List[Palette] = [
+    Palette(
+        name="Professional Classic",
+        description="Timeless professional palette",
+        psychology="Blue builds trust, neutral tones provide balance",
+        colors=[
+            Color(hex="#2F54EB", name="Royal Blue", usage="Primary"),
+            Color(hex="#597EF7", name="Light Blue", usage="Secondary"),
+            Color(hex="#F5222D", name="Action Red", usage="Accent"),
+            Color(hex="#FAFAFA", name="Off White", usage="Background"),
+            Color(hex="#1F1F1F", name="Near Black", usage="Text")
+        ]
+    ),
+    Palette(
+        name="Modern Minimal",
+        description="Clean, contemporary design",
+        psychology="Monochrome with accent creates sophisticated modern feel",
+        colors=[
+            Color(hex="#000000", name="Pure Black", usage="Primary"),
+            Color(hex="#595959", name="Gray", usage="Secondary"),
+            Color(hex="#EB2F96", name="Magenta", usage="Accent"),
+            Color(hex="#FFFFFF", name="White", usage="Background"),
+            Color(hex="#262626", name="Dark Gray", usage="Text")
+        ]
+    ),
+    Palette(
+        name="Nature Inspired",
+        description="Organic, earthy tones",
+        psychology="Green represents growth and harmony, connecting to nature",
+        colors=[
+            Color(hex="#52C41A", name="Fresh Green", usage="Primary"),
+            Color(hex="#389E0D", name="Forest", usage="Secondary"),
+            Color(hex="#FAAD14", name="Sunflower", usage="Accent"),
+            Color(hex="#F6FFED", name="Mint Cream", usage="Background"),
+            Color(hex="#135200", name="Deep Green", usage="Text")
+        ]
+    ),
+    Palette(
+        name="Warm Sunset",
+        description="Energetic and inviting",
+        psychology="Warm colors evoke energy, passion, and friendliness",
+        colors=[
+            Color(hex="#FA541C", name="Sunset Orange", usage="Primary"),
+            Color(hex="#FAAD14", name="Gold", usage="Secondary"),
+            Color(hex="#F5222D", name="Coral Red", usage="Accent"),
+            Color(hex="#FFF7E6", name="Warm White", usage="Background"),
+            Color(hex="#AD2102", name="Deep Orange", usage="Text")
+        ]
+    ),
+    Palette(
+        name="Cool Ocean",
+        description="Calm and refreshing",
+        psychology="Cool tones promote relaxation and trust",
+        colors=[
+            Color(hex="#1890FF", name="Ocean Blue", usage="Primary"),
+            Color(hex="#13C2C2", name="Teal", usage="Secondary"),
+            Color(hex="#722ED1", name="Purple Accent", usage="Accent"),
+            Color(hex="#E6F7FF", name="Sky White", usage="Background"),
+            Color(hex="#003A8C", name="Deep Blue", usage="Text")
+        ]
+    )
+]
 
 
-@api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_ai(request: Request, data: ChatRequest):
-    """Chat with AI for palette refinement"""
+def with_fresh_ids(palettes: List[Palette]) -> List[Palette]:
+    """Copy shared palettes with new ids so palettes from separate responses stay distinct"""
+    return [palette.model_copy(update={"id": str(uuid.uuid4())}) for palette in palettes]
+
+
+def generate_fallback_palettes(category: str) -> List[Palette]:
+    """Generate fallback palettes based on category"""
+    return with_fresh_ids(FALLBACK_PALETTES.get(category, DEFAULT_PALETTES))
+
+
+async def prepare_chat(request: Request, data: ChatRequest) -> tuple[str, int]:
+    """Check configuration and rate limits for a chat request. Returns (system_message, remaining)"""
     ip = get_client_ip(request)
     
-    # Check rate limit
-    allowed, remaining = check_rate_limit(ip, "revision")
-    if not allowed:
-        raise HTTPException(
-            status_code=429,
-            detail="Daily revision limit reached. Please try again tomorrow."
-        )
-    
-    gemini_api_key = os.environ.get('GOOGLE_GEMINI_API_KEY')
     if not gemini_api_key:
         logger.error('GOOGLE_GEMINI_API_KEY not set')
         raise HTTPException(status_code=500, detail='Google Gemini API key not configured')
     
-    # Build context for AI
-    palettes_context = json.dumps(data.context.get("palettes", []), indent=2)
+    # Build context for AI before taking a revision, so bad context doesn't cost one
+    try:
+        palettes_context = orjson.dumps(data.context.get("palettes", []), option=orjson.OPT_INDENT_2).decode()
+    except orjson.JSONEncodeError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid palettes context: {e}")
     business_info = data.context.get("business_info", {})
     
     system_message = f"""You are a professional color consultant helping refine color palettes for {business_info.get('business_name', 'a business')}.
@@ -466,26 +778,81 @@ Current Palettes:
 
 Provide helpful, concise advice about color choices, psychology, and brand alignment. When suggesting color changes, always include specific hex codes. Format color suggestions clearly."""
 
+    # Check rate limit
+    allowed, remaining = await check_rate_limit(ip, "revision")
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Daily revision limit reached. Please try again tomorrow."
+        )
+    
+    return system_message, remaining
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Encode a server-sent event with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def stream_chat_events(response: httpx.Response, remaining: int) -> AsyncIterator[bytes]:
+    """Relay Gemini response chunks as message events, then a done event with the remaining revisions"""
     try:
-        genai.configure(api_key=gemini_api_key)
-        model = genai.GenerativeModel('gemini-pro', system_instruction=system_message)
-        response = model.generate_content(data.message)
-        
-        if hasattr(response, 'text'):
-            ai_response = response.text
-        else:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            text = _gemini_text(orjson.loads(line[5:]))
+            if text:
+                yield sse_event("message", {"text": text})
+    except Exception as e:
+        logger.error(f"Error in chat stream: {e}")
+        yield sse_event("error", {"detail": "Failed to get AI response"})
+        return
+    finally:
+        await response.aclose()
+    
+    yield sse_event("done", {"remaining_revisions": remaining})
+
+
+@api_router.post("/chat", response_model=ChatResponse)
+async def chat_with_ai(request: Request, data: ChatRequest):
+    """Chat with AI for palette refinement"""
+    system_message, remaining = await prepare_chat(request, data)
+    
+    try:
+        ai_response = await gemini_generate(data.message, system_message)
+        if not ai_response:
             ai_response = "Unable to generate response"
         
-        return ChatResponse(
-            response=ai_response,
-            remaining_revisions=remaining
-        )
+        return ORJSONResponse({
+            "response": ai_response,
+            "remaining_revisions": remaining
+        })
         
     except Exception as e:
         logger.error(f"Error in chat: {e}")
         raise HTTPException(status_code=500, detail="Failed to get AI response")
 
 
+@api_router.post("/chat/stream")
+async def stream_chat_with_ai(request: Request, data: ChatRequest):
+    """Chat with AI for palette refinement, streaming the reply as server-sent events"""
+    system_message, remaining = await prepare_chat(request, data)
+    
+    try:
+        response = await gemini_stream(data.message, system_message)
+    except Exception as e:
+        logger.error(f"Error in chat: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get AI response")
+    
+    return StreamingResponse(
+        stream_chat_events(response, remaining),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Release the upstream connection even if the client leaves before streaming starts
+        background=BackgroundTask(response.aclose)
+    )
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -498,6 +865,18 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def create_db_indexes():
+    # MongoDB only backs status checks, so don't let it block startup
+    try:
+        await db.status_checks.create_index([("timestamp", -1)])
+    except PyMongoError as e:
+        logger.warning(f"Could not create status check indexes: {e}")
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    await gemini_http.aclose()
+    if redis_client is not None:
+        await redis_client.aclose()
@@ -121,8 +121,8 @@ class ChromaBizAPITester:
             "target_gender": "All Genders"
         }
         
-        # This should still return 200 but might have fallback behavior
-        return self.run_test("Generate Palettes (Invalid)", "POST", "generate-palettes", 200, data=invalid_data)
+        # Rejected before any rate limit is consumed
+        return self.run_test("Generate Palettes (Invalid)", "POST", "generate-palettes", 422, data=invalid_data)
 
     def test_chat_functionality(self, palettes_data=None):
         """Test chat functionality"""
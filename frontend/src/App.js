@@ -523,7 +523,7 @@ function ChatMessage({ message }) {
 // Chat Panel Component
 function ChatPanel({ className = '' }) {
   const { 
-    chatHistory, addChatMessage, clearChatHistory, isChatting, setIsChatting,
+    chatHistory, addChatMessage, appendToLastChatMessage, clearChatHistory, isChatting, setIsChatting,
     rateLimits, setRateLimits, palettes, businessInfo, sessionId
   } = useAppContext();
 
@@ -554,21 +554,64 @@ function ChatPanel({ className = '' }) {
     setIsChatting(true);
 
     try {
-      const response = await axios.post(`${API}/chat`, {
-        message: userMessage,
-        context: {
-          palettes: palettes.map(p => ({
-            name: p.name,
-            colors: p.colors.map(c => ({ hex: c.hex, name: c.name, usage: c.usage }))
-          })),
-          business_info: businessInfo
-        },
-        session_id: sessionId
+      const response = await fetch(`${API}/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          message: userMessage,
+          context: {
+            palettes: palettes.map(p => ({
+              name: p.name,
+              colors: p.colors.map(c => ({ hex: c.hex, name: c.name, usage: c.usage }))
+            })),
+            business_info: businessInfo
+          },
+          session_id: sessionId
+        })
       });
-      addChatMessage('assistant', response.data.response);
-      setRateLimits(prev => ({ ...prev, revisions_remaining: response.data.remaining_revisions }));
+      if (!response.ok) {
+        const error = new Error(`Chat request failed with status ${response.status}`);
+        error.status = response.status;
+        throw error;
+      }
+
+      // Read server-sent events, growing the assistant message as text arrives
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let event = 'message';
+          let data = '';
+          rawEvent.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          });
+          const payload = JSON.parse(data);
+          if (event === 'message') {
+            if (started) {
+              appendToLastChatMessage(payload.text);
+            } else {
+              addChatMessage('assistant', payload.text);
+              started = true;
+            }
+          } else if (event === 'done') {
+            if (!started) addChatMessage('assistant', 'Unable to generate response');
+            setRateLimits(prev => ({ ...prev, revisions_remaining: payload.remaining_revisions }));
+          } else if (event === 'error') {
+            throw new Error(payload.detail);
+          }
+        }
+      }
     } catch (error) {
-      if (error.response?.status === 429) {
+      if (error.status === 429) {
         toast.error('Daily revision limit reached.');
         addChatMessage('assistant', 'Daily revision limit reached. Please try again tomorrow.');
       } else {
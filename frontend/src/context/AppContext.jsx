@@ -109,6 +109,14 @@ export function AppProvider({ children }) {
     setChatHistory(prev => [...prev, { role, content, timestamp: Date.now() }]);
   }, []);
 
+  const appendToLastChatMessage = useCallback((content) => {
+    setChatHistory(prev => {
+      if (prev.length === 0) return prev;
+      const last = prev[prev.length - 1];
+      return [...prev.slice(0, -1), { ...last, content: last.content + content }];
+    });
+  }, []);
+
   const clearChatHistory = useCallback(() => {
     setChatHistory([]);
     localStorage.removeItem(STORAGE_KEYS.CHAT_HISTORY);
@@ -134,6 +142,7 @@ export function AppProvider({ children }) {
     setBusinessInfo,
     chatHistory,
     addChatMessage,
+    appendToLastChatMessage,
     clearChatHistory,
     isGenerating,
     setIsGenerating,
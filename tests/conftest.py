@@ -0,0 +1,61 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import orjson
+import pytest
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+
+# server.py lives in backend/ and is run from there, so import it the same way
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Test client with a Gemini key, in-memory rate limits and empty caches"""
+    monkeypatch.setattr(server, "gemini_api_key", "test-key")
+    monkeypatch.setattr(server, "redis_client", None)
+    monkeypatch.setattr(server, "rate_limits", TTLCache(maxsize=100, ttl=server.RATE_LIMIT_WINDOW))
+    monkeypatch.setattr(server, "palette_cache", TTLCache(maxsize=10, ttl=60))
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def mock_gemini(monkeypatch):
+    """Route gemini_http through a MockTransport; call with a handler(request) -> httpx.Response.
+    The requests sent are collected on the returned function's .requests list"""
+    requests = []
+
+    def install(handler):
+        def record(request):
+            requests.append(request)
+            return handler(request)
+
+        monkeypatch.setattr(server, "gemini_http", httpx.AsyncClient(transport=httpx.MockTransport(record)))
+
+    install.requests = requests
+    return install
+
+
+def gemini_payload(*texts):
+    """A Gemini generateContent response body with one candidate made of text parts"""
+    return {"candidates": [{"content": {"parts": [{"text": text} for text in texts]}}]}
+
+
+def gemini_sse(*chunks):
+    """A Gemini streamGenerateContent?alt=sse body with one event per text chunk"""
+    return "".join(f"data: {orjson.dumps(gemini_payload(chunk)).decode()}\r\n\r\n" for chunk in chunks).encode()
+
+
+# Rate limit test clock: ten minutes into an hourly bucket
+IP = "203.0.113.7"
+BUCKET_START = 1_700_000_000 - 1_700_000_000 % server.RATE_LIMIT_BUCKET
+NOW = BUCKET_START + 600
+
+
+def isoformat(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
@@ -0,0 +1,87 @@
+import httpx
+import orjson
+
+import server
+from tests.conftest import gemini_sse
+
+CHAT_REQUEST = {
+    "message": "Make the first palette warmer",
+    "context": {
+        "palettes": [{"name": "Ocean", "colors": [{"hex": "#1890FF", "name": "Blue", "usage": "Primary"}]}],
+        "business_info": {"business_name": "Bean There", "age_groups": ["25-34"]},
+    },
+    "session_id": "test-session",
+}
+
+
+def revisions_remaining(api, ip):
+    return api.get("/api/rate-limit", headers={"x-forwarded-for": ip}).json()["revisions_remaining"]
+
+
+def test_unencodable_context_is_rejected_without_using_a_revision(api):
+    request = {**CHAT_REQUEST, "context": {"palettes": [{"name": "Huge", "weight": 2 ** 70}]}}
+
+    response = api.post("/api/chat", json=request, headers={"x-forwarded-for": "198.51.100.1"})
+
+    assert response.status_code == 422
+    assert revisions_remaining(api, "198.51.100.1") == 3
+
+
+class FailingStream(httpx.AsyncByteStream):
+    """Sends one Gemini chunk, then drops the connection"""
+
+    async def __aiter__(self):
+        yield gemini_sse("Try terracotta ")
+        raise httpx.ReadError("connection reset")
+
+
+def stream_chat(api, ip="198.51.100.1"):
+    return api.post("/api/chat/stream", json=CHAT_REQUEST, headers={"x-forwarded-for": ip})
+
+
+def parse_events(body):
+    events = []
+    for raw in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in raw.split("\n"))
+        events.append((lines["event"], orjson.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_message_events_then_done(api, mock_gemini):
+    mock_gemini(lambda request: httpx.Response(200, content=gemini_sse("Try ", "#E2725B")))
+
+    response = stream_chat(api)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert parse_events(response.text) == [
+        ("message", {"text": "Try "}),
+        ("message", {"text": "#E2725B"}),
+        ("done", {"remaining_revisions": 2}),
+    ]
+
+
+def test_stream_upstream_error_is_500_before_any_events(api, mock_gemini):
+    for status in (400, 503):
+        mock_gemini(lambda request: httpx.Response(status, json={"error": {"message": "nope"}}))
+
+        response = stream_chat(api, ip=f"198.51.100.{status % 256}")
+
+        assert response.status_code == 500
+        assert response.json() == {"detail": "Failed to get AI response"}
+
+
+def test_stream_failure_partway_sends_error_event(api, mock_gemini):
+    mock_gemini(lambda request: httpx.Response(200, stream=FailingStream()))
+
+    response = stream_chat(api)
+
+    assert response.status_code == 200
+    assert parse_events(response.text) == [
+        ("message", {"text": "Try terracotta "}),
+        ("error", {"detail": "Failed to get AI response"}),
+    ]
+
+
+def test_sse_event_encoding():
+    assert server.sse_event("done", {"remaining_revisions": 1}) == b'event: done\ndata: {"remaining_revisions":1}\n\n'
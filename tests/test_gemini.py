@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+import server
+from tests.conftest import gemini_payload, gemini_sse
+
+
+@pytest.fixture(autouse=True)
+def gemini_key(monkeypatch):
+    monkeypatch.setattr(server, "gemini_api_key", "test-key")
+
+
+def test_generate_sends_key_header_and_joins_text(mock_gemini):
+    mock_gemini(lambda request: httpx.Response(200, json=gemini_payload("Hello ", "there")))
+
+    assert asyncio.run(server.gemini_generate("Hi")) == "Hello there"
+
+    request = mock_gemini.requests[0]
+    assert request.url.path.endswith("/models/gemini-pro:generateContent")
+    assert request.headers["x-goog-api-key"] == "test-key"
+    assert "key" not in request.url.params
+
+
+def test_system_instruction_only_sent_when_given(mock_gemini):
+    mock_gemini(lambda request: httpx.Response(200, json=gemini_payload("ok")))
+
+    asyncio.run(server.gemini_generate("Hi"))
+    asyncio.run(server.gemini_generate("Hi", "Be brief"))
+
+    without, with_instruction = (orjson.loads(request.content) for request in mock_gemini.requests)
+    assert without == {"contents": [{"role": "user", "parts": [{"text": "Hi"}]}]}
+    assert with_instruction["systemInstruction"] == {"parts": [{"text": "Be brief"}]}
+
+
+def test_stream_requests_sse(mock_gemini):
+    mock_gemini(lambda request: httpx.Response(200, content=gemini_sse("ok")))
+
+    async def start_stream():
+        response = await server.gemini_stream("Hi", "Be brief")
+        await response.aclose()
+
+    asyncio.run(start_stream())
+
+    request = mock_gemini.requests[0]
+    assert request.url.path.endswith("/models/gemini-pro:streamGenerateContent")
+    assert request.url.params["alt"] == "sse"
+    assert request.headers["x-goog-api-key"] == "test-key"
+
+
+def test_generate_raises_on_upstream_error(mock_gemini):
+    mock_gemini(lambda request: httpx.Response(500, json={"error": {"message": "boom"}}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(server.gemini_generate("Hi"))
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"candidates": []},
+    {"candidates": None},
+    {"candidates": [{}]},
+    {"candidates": [{"content": {"parts": []}}]},
+])
+def test_missing_candidates_give_empty_text(payload):
+    assert server._gemini_text(payload) == ""
@@ -0,0 +1,71 @@
+import server
+
+REQUEST = {
+    "business_name": "Bean There",
+    "business_category": "Food & Beverage",
+    "target_country": "United States",
+    "age_groups": ["25-34"],
+    "target_gender": "All Genders",
+}
+
+VALID = '[{"name": "Roast", "description": "", "psychology": "", "colors": [{"hex": "#6F4E37", "name": "Coffee", "usage": "Primary"}]}]'
+MALFORMED = '[{"name": "Bad", "description": "", "psychology": "", "colors": [{"hex": null, "name": [1], "usage": {}}]}]'
+
+
+def generate(api, ip):
+    return api.post("/api/generate-palettes", json=REQUEST, headers={"x-forwarded-for": ip})
+
+
+def fake_gemini(monkeypatch, reply):
+    calls = []
+
+    async def gemini_generate(text, system_instruction=None):
+        calls.append(text)
+        return reply
+
+    monkeypatch.setattr(server, "gemini_generate", gemini_generate)
+    return calls
+
+
+def test_valid_palettes_are_cached(api, monkeypatch):
+    calls = fake_gemini(monkeypatch, VALID)
+
+    first = generate(api, "198.51.100.1").json()["palettes"]
+    second = generate(api, "198.51.100.2").json()["palettes"]
+
+    assert len(calls) == 1
+    assert [p["name"] for p in first] == [p["name"] for p in second] == ["Roast"]
+    assert first[0]["id"] != second[0]["id"]
+
+
+def test_malformed_palettes_are_not_cached(api, monkeypatch):
+    calls = fake_gemini(monkeypatch, MALFORMED)
+
+    response = generate(api, "198.51.100.1").json()
+    generate(api, "198.51.100.2")
+
+    assert len(calls) == 2
+    assert len(server.palette_cache) == 0
+    assert [p["name"] for p in response["palettes"]] == ["Warm Appetite"]
+
+
+def generations_remaining(api, ip):
+    return api.get("/api/rate-limit", headers={"x-forwarded-for": ip}).json()["generations_remaining"]
+
+
+def test_rejected_requests_do_not_use_a_generation(api, monkeypatch):
+    calls = fake_gemini(monkeypatch, VALID)
+    ip = "198.51.100.9"
+
+    response = api.post(
+        "/api/generate-palettes", json={**REQUEST, "business_name": " "}, headers={"x-forwarded-for": ip}
+    )
+    assert response.status_code == 422
+    assert generations_remaining(api, ip) == 1
+
+    monkeypatch.setattr(server, "gemini_api_key", None)
+    response = generate(api, ip)
+    assert response.status_code == 500
+    assert generations_remaining(api, ip) == 1
+
+    assert calls == []
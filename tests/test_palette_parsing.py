@@ -0,0 +1,76 @@
+import pytest
+
+from server import _find_json_span, parse_palette_response
+
+
+def span_text(text, open_ch, close_ch, start=0):
+    span = _find_json_span(text, open_ch, close_ch, start)
+    return text[span[0]:span[1]] if span else None
+
+
+def test_fenced_block():
+    text = 'Here you go:\n```json\n[{"name": "A", "colors": []}]\n```\nEnjoy!'
+    assert span_text(text, "[", "]") == '[{"name": "A", "colors": []}]'
+
+
+def test_bracket_inside_string():
+    text = '[{"name": "Bold ] Bright"}] trailing ]'
+    assert span_text(text, "[", "]") == '[{"name": "Bold ] Bright"}]'
+
+
+def test_escaped_quote_inside_string():
+    text = r'[{"name": "Say \"]\" loudly"}] after'
+    assert span_text(text, "[", "]") == r'[{"name": "Say \"]\" loudly"}]'
+
+
+def test_unbalanced_input():
+    assert _find_json_span('[{"name": "A"}', "[", "]") is None
+    assert _find_json_span("no json here", "[", "]") is None
+
+
+def test_palettes_wrapper():
+    text = 'Intro {"note": 1} then {"palettes": [{"name": "}"}]} done'
+    first = _find_json_span(text, "{", "}")
+    assert text[first[0]:first[1]] == '{"note": 1}'
+    assert span_text(text, "{", "}", first[1]) == '{"palettes": [{"name": "}"}]}'
+
+
+def test_parse_skips_bracketed_prose_before_array():
+    text = 'Palettes [see notes] below:\n[{"name": "Ocean", "description": "", "psychology": "", "colors": []}]'
+    palettes = parse_palette_response(text)
+    assert [palette.name for palette in palettes] == ["Ocean"]
+
+
+@pytest.mark.parametrize("prose", ["Footnote [1] below.", 'Options ["a", "b"] and []'])
+def test_parse_skips_bracketed_prose_that_is_valid_json(prose):
+    text = prose + '\n[{"name": "Ocean", "description": "", "psychology": "", "colors": []}]'
+    palettes = parse_palette_response(text)
+    assert [palette.name for palette in palettes] == ["Ocean"]
+
+
+def test_parse_palettes_wrapper():
+    text = 'Result: {"palettes": [{"name": "Forest", "description": "", "psychology": "", "colors": []}]}'
+    palettes = parse_palette_response(text)
+    assert [palette.name for palette in palettes] == ["Forest"]
+
+
+def test_parse_rejects_wrong_type_fields():
+    text = '[{"name": "Bad", "description": "", "psychology": "", "colors": [{"hex": null, "name": [1], "usage": {}}]}]'
+    assert parse_palette_response(text) == []
+
+
+def test_parse_fills_in_missing_fields():
+    palettes = parse_palette_response('[{"colors": [{"hex": "#123456"}]}]')
+    assert palettes[0].name == "Palette"
+    assert palettes[0].colors[0].model_dump() == {"hex": "#123456", "name": "Unknown", "usage": "General"}
+
+
+@pytest.mark.parametrize("text", [
+    '[{"colors": null}]',
+    '[1, 2]',
+    '[{"name": "A"}, 2]',
+    '{"palettes": null}',
+    '[{"colors": ["#fff"]}]',
+])
+def test_parse_rejects_wrong_structure(text):
+    assert parse_palette_response(text) == []
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from cachetools import TTLCache
+from fakeredis import FakeAsyncRedis
+
+import server
+from server import (
+    RATE_LIMIT_BUCKET,
+    RATE_LIMIT_WINDOW,
+    _check_local_rate_limit,
+    _check_redis_rate_limit,
+    _get_local_remaining_limits,
+    _get_redis_remaining_limits,
+)
+from tests.conftest import BUCKET_START, IP, NOW, isoformat
+
+
+class MemoryLimiter:
+    def check(self, limit_type, now, ip=IP):
+        return _check_local_rate_limit(ip, limit_type, now)
+
+    def remaining(self, now, ip=IP):
+        return _get_local_remaining_limits(ip, now)
+
+
+class RedisLimiter:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def check(self, limit_type, now, ip=IP):
+        return asyncio.run(_check_redis_rate_limit(ip, limit_type, now))
+
+    def remaining(self, now, ip=IP):
+        return asyncio.run(_get_redis_remaining_limits(ip, now))
+
+
+@pytest.fixture
+def memory_limiter(monkeypatch):
+    monkeypatch.setattr(server, "rate_limits", TTLCache(maxsize=100, ttl=RATE_LIMIT_WINDOW))
+    return MemoryLimiter()
+
+
+@pytest.fixture
+def redis_limiter(monkeypatch):
+    redis = FakeAsyncRedis()
+    monkeypatch.setattr(server, "redis_client", redis)
+    monkeypatch.setattr(
+        server, "rate_limit_check_script", redis.register_script(server._RATE_LIMIT_CHECK_LUA), raising=False
+    )
+    monkeypatch.setattr(
+        server, "rate_limit_usage_script", redis.register_script(server._RATE_LIMIT_USAGE_LUA), raising=False
+    )
+    return RedisLimiter(redis)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request):
+    return request.getfixturevalue(f"{request.param}_limiter")
+
+
+def test_generation_allowed_then_denied_within_window(limiter):
+    assert limiter.check("generation", NOW) == (True, 0)
+    assert limiter.check("generation", NOW + 60) == (False, 0)
+
+
+def test_revisions_count_down_then_deny(limiter):
+    results = [limiter.check("revision", NOW + i) for i in range(4)]
+    assert results == [(True, 2), (True, 1), (True, 0), (False, 0)]
+
+
+def test_limit_types_and_clients_are_independent(limiter):
+    assert limiter.check("generation", NOW) == (True, 0)
+    assert limiter.check("revision", NOW) == (True, 2)
+    assert limiter.check("generation", NOW, ip="198.51.100.1") == (True, 0)
+
+
+def test_unknown_limit_type_is_denied(limiter):
+    assert limiter.check("download", NOW) == (False, 0)
+
+
+def test_usage_frees_up_when_bucket_leaves_window(limiter):
+    assert limiter.check("generation", NOW) == (True, 0)
+    assert limiter.check("generation", BUCKET_START + RATE_LIMIT_WINDOW - 1) == (False, 0)
+    assert limiter.check("generation", BUCKET_START + RATE_LIMIT_WINDOW) == (True, 0)
+
+
+def test_remaining_limits_for_new_client(limiter):
+    assert limiter.remaining(NOW) == {
+        "generations_remaining": 1,
+        "revisions_remaining": 3,
+        "reset_time": isoformat(NOW + RATE_LIMIT_WINDOW),
+    }
+
+
+def test_remaining_limits_after_usage(limiter):
+    limiter.check("generation", NOW)
+    limiter.check("revision", NOW + RATE_LIMIT_BUCKET)
+
+    assert limiter.remaining(NOW + RATE_LIMIT_BUCKET) == {
+        "generations_remaining": 0,
+        "revisions_remaining": 2,
+        "reset_time": isoformat(BUCKET_START + RATE_LIMIT_WINDOW),
+    }
+
+
+def test_remaining_limits_after_oldest_bucket_expires(limiter):
+    limiter.check("generation", NOW)
+    limiter.check("revision", NOW + RATE_LIMIT_BUCKET)
+
+    assert limiter.remaining(BUCKET_START + RATE_LIMIT_WINDOW) == {
+        "generations_remaining": 1,
+        "revisions_remaining": 2,
+        "reset_time": isoformat(BUCKET_START + RATE_LIMIT_BUCKET + RATE_LIMIT_WINDOW),
+    }
+
+
+def test_polling_does_not_store_client(memory_limiter):
+    memory_limiter.remaining(NOW)
+    assert IP not in server.rate_limits
+
+
+def test_redis_key_expires_with_window(redis_limiter):
+    redis_limiter.check("generation", NOW)
+    ttl = asyncio.run(redis_limiter.redis.ttl(server._rate_limit_key(IP, "generation")))
+    assert 0 < ttl <= RATE_LIMIT_WINDOW
@@ -0,0 +1,22 @@
+import asyncio
+
+from pymongo.errors import ServerSelectionTimeoutError
+
+import server
+
+
+class UnreachableCollection:
+    async def create_index(self, keys):
+        raise ServerSelectionTimeoutError("localhost:27017: connection refused")
+
+
+class UnreachableDatabase:
+    status_checks = UnreachableCollection()
+
+
+def test_index_creation_failure_does_not_block_startup(monkeypatch, caplog):
+    monkeypatch.setattr(server, "db", UnreachableDatabase())
+
+    asyncio.run(server.create_db_indexes())
+
+    assert "Could not create status check indexes" in caplog.text